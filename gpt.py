@@ -1,30 +1,127 @@
+import os
+
 import transformers
+import torch
+
+# Tune the CPU backend for Xeon (Intel Dev Cloud): one intra-op thread per
+# core, a small interop pool, and oneDNN kernels for the GEMMs. interop can
+# only be set once per process, hence the guard.
+torch.set_num_threads(os.cpu_count())
+try:
+    torch.set_num_interop_threads(2)
+except RuntimeError:
+    pass
+torch.backends.mkldnn.enabled = True
+
+
+SYSTEM_INPUT = "You are a Customer Service expert!"
+EXAMPLE = "Communication: z/10 Resolution: y/10 Emotion Handling: x/10. So, the overall Customer Satisfaction Index can be calculated as the average of these three scores, which is approximately x+y+z/10."
+PROMPT_PREFIX = f"### System:\n{SYSTEM_INPUT}\n### User:\nI will provide you with the transcripts of a customer service call. I will also provide you the tone of the voices at each timestamp.('a': Anger 'h': Happy 'n': Neutral) You have to analyse both and come up with a Customer Satisfaction Index. You should also give reason why..\n<Transcripts of the talks>\n"
+PROMPT_MIDDLE = "<Transcripts of the talks\>\n<Tone and emotion of the voice>\n"
+PROMPT_SUFFIX = f"<\Tone and emotion of the voice>\n<Example>\n{EXAMPLE}<Example\>\n### Assistant:\n"
 
 
 class HF_LLM:
-    
-    def __init__(self, model_name):
-        self.model = transformers.AutoModelForCausalLM.from_pretrained(model_name)
-        self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+
+    def __init__(self, model_name=None, model=None, tokenizer=None,
+                 quantization=None, use_ipex=False, max_new_tokens=256,
+                 max_context=2048, chunk_tokens=1500):
+        self.max_new_tokens = max_new_tokens
+        self.max_context = max_context
+        self.chunk_tokens = chunk_tokens
+        if model is None:
+            # Decoding is memory-bandwidth bound, so load the weights in bf16 by
+            # default and optionally in 8/4 bit via bitsandbytes.
+            kwargs = {"torch_dtype": torch.bfloat16, "device_map": "auto"}
+            if quantization == "8bit":
+                kwargs["quantization_config"] = transformers.BitsAndBytesConfig(
+                    load_in_8bit=True, llm_int8_threshold=6.0)
+            elif quantization == "4bit":
+                kwargs["quantization_config"] = transformers.BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.bfloat16)
+            model = transformers.AutoModelForCausalLM.from_pretrained(model_name, **kwargs)
+            if use_ipex:
+                # On Xeon (Intel Dev Cloud) decode is bandwidth-bound; IPEX moves
+                # the GEMMs onto AVX512/AMX bf16 kernels.
+                import intel_extension_for_pytorch as ipex
+                model = ipex.llm.optimize(model.eval(), dtype=torch.bfloat16)
+        if tokenizer is None:
+            tokenizer = transformers.AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        self.model = model.eval()
+        self.tokenizer = tokenizer
         self.model_name = model_name
+        # The prompt boilerplate never changes, so encode it once here
+        # instead of re-running BPE over it on every call.
+        self._prefix_ids = self._encode(PROMPT_PREFIX)
+        self._middle_ids = self._encode(PROMPT_MIDDLE)
+        self._suffix_ids = self._encode(PROMPT_SUFFIX)
+
+    def _encode(self, text):
+        return self.tokenizer(text, return_tensors="pt", add_special_tokens=False).input_ids
+
+    def build_prompt(self, transcripts, emotions):
+        return f"{PROMPT_PREFIX}{transcripts}{PROMPT_MIDDLE}{emotions}{PROMPT_SUFFIX}"
+
+    @torch.inference_mode()
+    def _summarize_chunk(self, text):
+        prompt = f"### System:\nYou summarize segments of customer service calls.\n### User:\nSummarize this call segment. Keep the issues raised, how the official handled them and the tone of both sides:\n{text}\n### Assistant:\n"
+        inputs = self._encode(prompt).to(self.model.device)
+        outputs = self.model.generate(
+            inputs,
+            max_new_tokens=128,
+            use_cache=True,
+            do_sample=False,
+            num_beams=1,
+            pad_token_id=self.tokenizer.eos_token_id,
+        )
+        return self.tokenizer.decode(outputs[0][inputs.shape[1]:], skip_special_tokens=True)
+
+    def condense(self, transcripts):
+        # Attention prefill is O(N^2) in prompt length, so very long calls
+        # are summarized chunk by chunk and the CSI prompt runs on the
+        # concatenated summaries instead of the raw transcripts.
+        transcripts = str(transcripts)
+        ids = self.tokenizer(transcripts, add_special_tokens=False).input_ids
+        if len(ids) <= self.max_context:
+            return transcripts
+        summaries = []
+        for start in range(0, len(ids), self.chunk_tokens):
+            chunk = self.tokenizer.decode(ids[start:start + self.chunk_tokens])
+            summaries.append(self._summarize_chunk(chunk))
+        return "\n".join(summaries)
 
 # model_name = 'Intel/neural-chat-7b-v3-3'
 # model = transformers.AutoModelForCausalLM.from_pretrained(model_name)
 # tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
 
-    def generate_response(self, transcripts, emotions, system_input="You are a Customer Service expert!" ):
-
-        example = "Communication: z/10 Resolution: y/10 Emotion Handling: x/10. So, the overall Customer Satisfaction Index can be calculated as the average of these three scores, which is approximately x+y+z/10."
-        user_input = f"I will provide you with the transcripts of a customer service call. I will also provide you the tone of the voices at each timestamp.('a': Anger 'h': Happy 'n': Neutral) You have to analyse both and come up with a Customer Satisfaction Index. You should also give reason why..\n<Transcripts of the talks>\n{transcripts}<Transcripts of the talks\>\n<Tone and emotion of the voice>\n{emotions}<\Tone and emotion of the voice>\n<Example>\n{example}<Example\>"
-
-        # Format the input using the provided template
-        prompt = f"### System:\n{system_input}\n### User:\n{user_input}\n### Assistant:\n"
-
-        # Tokenize and encode the prompt
-        inputs = self.tokenizer.encode(prompt, return_tensors="pt", add_special_tokens=False)
+    @torch.inference_mode()
+    def generate_response(self, transcripts, emotions):
+
+        # Only the transcripts and emotions vary per call; the cached
+        # boilerplate ids are concatenated around them.
+        inputs = torch.cat(
+            [
+                self._prefix_ids,
+                self._encode(self.condense(transcripts)),
+                self._middle_ids,
+                self._encode(str(emotions)),
+                self._suffix_ids,
+            ],
+            dim=1,
+        )
+        inputs = inputs.to(self.model.device)
 
         # Generate a response
-        outputs = self.model.generate(inputs, max_length=100000, num_return_sequences=1)
+        outputs = self.model.generate(
+            inputs,
+            max_new_tokens=self.max_new_tokens,
+            use_cache=True,
+            do_sample=False,
+            num_beams=1,
+            pad_token_id=self.tokenizer.eos_token_id,
+        )
         response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
 
         # Extract only the assistant's response
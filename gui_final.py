@@ -4,20 +4,50 @@ import streamlit as st
 import os
 from main import csi
 
-from streamlit_chat import message
 import transformers
+from transformers import TextIteratorStreamer
+from transformers.pipelines.audio_utils import ffmpeg_read
+import torch
+import threading
+import logging
+
+# Inference only: no autograd bookkeeping anywhere in this process.
+torch.set_grad_enabled(False)
+
+# Debug logging (prompts, parsed queries, ...) only when asked for;
+# unconditional prints of multi-kB strings stall the server on slow TTYs.
+logging.basicConfig(level=logging.DEBUG if os.getenv("STREAMLIT_DEBUG") else logging.INFO)
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def load_tokenizer():
+    return transformers.AutoTokenizer.from_pretrained("Intel/neural-chat-7b-v3-3", use_fast=True)
+
+@st.cache_resource
+def load_model():
+    return transformers.AutoModelForCausalLM.from_pretrained(
+        "Intel/neural-chat-7b-v3-3", torch_dtype=torch.bfloat16, device_map="auto")
+
+@st.cache_resource
+def get_app():
+    # csi() builds the Transcriptor (whisper-large-v3) and the LLM
+    # wrapper; cache it so reruns don't reload multi-GB models.
+    return csi('Intel/neural-chat-7b-v3-3', load_model(), load_tokenizer())
+
+tokeniser = load_tokenizer()
+model = load_model()
 
-if "tokeniser" not in st.session_state:
-    st.session_state.tokeniser = transformers.AutoTokenizer.from_pretrained("Intel/neural-chat-7b-v3-3")
-if "model" not in st.session_state:
-    st.session_state.model = transformers.AutoModelForCausalLM.from_pretrained("Intel/neural-chat-7b-v3-3")
 if "result" not in st.session_state:
     st.session_state.result = None
 if "transcripts" not in st.session_state:
     st.session_state.transcripts = None
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "input_ids" not in st.session_state:
+    st.session_state.input_ids = None
+if "pkv" not in st.session_state:
+    st.session_state.pkv = None
+if "prompt_str" not in st.session_state:
+    st.session_state.prompt_str = ""
 if "conmessages" not in st.session_state:
     st.session_state.conmessages = []
 
@@ -49,8 +79,56 @@ st.markdown(background_image_style, unsafe_allow_html=True)
 
 #st.markdown(page_bg_img, unsafe_allow_html=True)
 
+def run_chat_turn(user_input):
+    st.session_state.conmessages.append(user_input)
+    st.chat_message("user").write(user_input)
+
+    new_ids = tokeniser(f"\n### User:\n{user_input}\n### Assistant:\n", return_tensors="pt", add_special_tokens=False).input_ids
+    inputs = torch.cat([st.session_state.input_ids, new_ids], dim=1)
+    inputs = inputs.to(model.device)
+    # Stream tokens into the UI as they are generated instead of
+    # blocking until the full decode finishes.
+    streamer = TextIteratorStreamer(tokeniser, skip_prompt=True, skip_special_tokens=True)
+    gen_out = {}
+
+    def _generate():
+        # Reusing past_key_values means only the new turn's tokens
+        # go through prefill instead of the whole conversation.
+        gen_out["out"] = model.generate(
+            inputs,
+            past_key_values=st.session_state.pkv,
+            streamer=streamer,
+            max_new_tokens=256,
+            use_cache=True,
+            do_sample=False,
+            num_beams=1,
+            pad_token_id=tokeniser.eos_token_id,
+            return_dict_in_generate=True,
+        )
+
+    thread = threading.Thread(target=_generate)
+    thread.start()
+    with st.chat_message("assistant"):
+        reply = st.write_stream(streamer)
+    thread.join()
+    st.session_state.pkv = gen_out["out"].past_key_values
+    st.session_state.conmessages.append(reply)
+
+    # Extend the history with the generated ids themselves: pkv holds
+    # states for exactly these tokens, and decode->encode round-trips
+    # are not identities, so re-tokenizing the reply text would
+    # misalign the cache with the claimed prefix.
+    sequences = gen_out["out"].sequences
+    if sequences[0, -1].item() == tokeniser.eos_token_id:
+        sequences = sequences[:, :-1]
+    st.session_state.input_ids = sequences.cpu()
+    # Text-side mirror of input_ids: append in place, never rebuilt with join
+    st.session_state.prompt_str += f"\n### User:\n{user_input}\n### Assistant:\n{reply}"
+    logger.debug("prompt=%s", st.session_state.prompt_str)
+
+
 def main():
-    
+
     # Add pages to the app
     st.sidebar.title("Navigation")
     page = st.sidebar.selectbox("Upload audio before going to the chat menu.", ["Upload Audio", "Chat"])
@@ -63,15 +141,20 @@ def main():
 
         if uploaded_file is not None:
             st.write("File uploaded successfully!..Wait for the report..")
-            content = uploaded_file.getvalue()
-                
-                # You can save the content to a temporary file if necessary
-            with open("temp.wav", "wb") as f:
-                f.write(content)
-            # Initialize the csi object with the API key
-            app = csi('Intel/neural-chat-7b-v3-3',st.session_state.model,st.session_state.tokeniser)
-            # Process the audio file
-            st.session_state.result,st.session_state.transcripts = app.process_return_with_transcripts("temp.wav")
+            # Decode the upload in memory instead of writing a temp file
+            # that the models would immediately re-read and re-decode.
+            # ffmpeg handles both wav and mp3 (the sox_io backend behind
+            # torchaudio.load cannot decode mp3) and resamples to the
+            # 16 kHz mono both models expect.
+            audio = ffmpeg_read(uploaded_file.getvalue(), 16000)
+            # One csi instance per process, cached across reruns
+            app = get_app()
+            # Process the audio
+            st.session_state.result,st.session_state.transcripts = app.process_array_return_with_transcripts(audio, 16000)
+            # New audio means a new conversation: drop the cached history
+            # ids and the KV cache from the previous one.
+            st.session_state.input_ids = None
+            st.session_state.pkv = None
             
             # Display the processed result
             st.write("Processed Result:")
@@ -86,32 +169,23 @@ def main():
         
             
         
-        st.session_state.messages = [f"### System:You are a customer service expert that gets the transcription of user calls and then gives a report on it. then you answer queries from the user on how he can improve. Note: user is the customer service official\n### User:{st.session_state.transcripts}\n### Assistant:{st.session_state.result}"]
-        
+        # Tokenize the preamble once; later turns only encode their own text
+        # instead of re-running BPE over the whole history every rerun.
+        if st.session_state.input_ids is None:
+            preamble = f"### System:You are a customer service expert that gets the transcription of user calls and then gives a report on it. then you answer queries from the user on how he can improve. Note: user is the customer service official\n### User:{st.session_state.transcripts}\n### Assistant:{st.session_state.result}"
+            st.session_state.input_ids = tokeniser(preamble, return_tensors="pt", add_special_tokens=False).input_ids
+            st.session_state.prompt_str = preamble
+
+        # Render prior turns once; the new turn streams into its own bubble
+        # below instead of re-rendering the whole history afterwards.
+        for i, msg in enumerate(st.session_state.conmessages):
+            st.chat_message("user" if i % 2 == 0 else "assistant").write(msg)
+
         # with st.sidebar:
         user_input = st.text_input("Your message: ", key="user_input")
 
         if user_input:
-            
-            st.session_state.conmessages.append(user_input)
-            
-            prompt = st.session_state.messages.append(f"\n### User:\n{user_input}\n### Assistant:\n")
-            prompt = " ".join(st.session_state.messages)
-            print(prompt)
-            inputs = st.session_state.tokeniser.encode(prompt, return_tensors="pt", add_special_tokens=False)
-            outputs = st.session_state.model.generate(inputs, max_length=10000, num_return_sequences=1)
-            response = st.session_state.tokeniser.decode(outputs[0], skip_special_tokens=True)
-            print(response)
-            test = response.split("### Assistant:\n")[-1]
-            st.session_state.conmessages.append(test)
-
-            
-            messages_d = st.session_state.conmessages
-            for i, msg in enumerate(messages_d):
-                if i % 2 != 0:
-                    message(msg, is_user=True, key=str(i) + '_user')
-                else:
-                    message(msg, is_user=False, key=str(i) + '_ai')
+            run_chat_turn(user_input)
         
 
 
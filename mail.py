@@ -1,35 +1,55 @@
 import transformers
+import torch
 import re
 from azure.communication.email import EmailClient
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import logging
 import os
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
+# Mails go out on a background pool so assess() never blocks the UI on
+# the Azure round-trip.
+_MAIL_POOL = ThreadPoolExecutor(max_workers=4)
 
+
+
+@torch.inference_mode()
 def generate_response(model, tokenizer, system_input, user_input):
 
     # Format the input using the provided template
     prompt = f"### System:\n{system_input}\n### User:\n{user_input}\n### Assistant:\n"
 
     # Tokenize and encode the prompt
-    inputs = tokenizer.encode(prompt, return_tensors="pt", add_special_tokens=False)
+    inputs = tokenizer(prompt, return_tensors="pt", add_special_tokens=False).input_ids
+    inputs = inputs.to(model.device)
 
     # Generate a response
-    outputs = model.generate(inputs, max_length=10000, num_return_sequences=1)
+    outputs = model.generate(
+        inputs,
+        max_new_tokens=256,
+        use_cache=True,
+        do_sample=False,
+        num_beams=1,
+        pad_token_id=tokenizer.eos_token_id,
+    )
     response = tokenizer.decode(outputs[0], skip_special_tokens=True)
 
     # Extract only the assistant's response
     return response.split("### Assistant:\n")[-1]
 
+# Compiled once at import instead of on every call
+_TRIPLE_STAR = re.compile(r'\*{3}(.*?)\*{3}', re.DOTALL)
+_CONTENT = re.compile(r'(\w+)\(\"(.*?)\"\)', re.DOTALL)
+
 def prompt_remover(string):
-    pattern = r'\*{3}(.*?)\*{3}'  
-    return re.findall(pattern, string)
+    return _TRIPLE_STAR.findall(string)
 
 def extract_content(string):
-    pattern = r'(\w+)\(\"(.*?)\"\)'
-    match = re.match(pattern, string)
+    match = _CONTENT.match(string)
     if match:
         return match.groups()
     else:
@@ -41,7 +61,6 @@ def sendmail(recipent,subject,content):
 
         connection_string = os.getenv('CONNECTION_STRING')
         client = EmailClient.from_connection_string(connection_string)
-        print(connection_string)
         message = {
             "senderAddress": "DoNotReply@07ddf0c0-e4bf-4093-8d55-396d8c1cbd30.azurecomm.net",
             "recipients":  {
@@ -57,19 +76,35 @@ def sendmail(recipent,subject,content):
         result = poller.result()
 
     except Exception as ex:
-        print(ex)
+        logger.error("sendmail failed: %s", ex)
 
-def assess(user_input, model, tokenizer):
-    template = '''***official("Johnny showed unprofessional behavior at the beginning of the call by using inappropriate language and taking a long time, later he gave a contact information.")***'''
+template = '''***official("Johnny showed unprofessional behavior at the beginning of the call by using inappropriate language and taking a long time, later he gave a contact information.")***'''
 
-    system_input = f'''You are the customer service supervisor. You should look at call transcripts and then see if there is any issue. if there is a issue in product you should say "{template}". if there is a issue with the customer service official you should say "***official("the problem description")***" . like what you say using the before rules must be enclosed with three asterisks before and after. the problem description between the parantheses be very much elaborate with details in explaining the problem and why it happened '''
-    response = generate_response(model, tokenizer, system_input, user_input)
+system_input = f'''You are the customer service supervisor. You should look at call transcripts and then see if there is any issue. if there is a issue in product you should say "{template}". if there is a issue with the customer service official you should say "***official("the problem description")***" . like what you say using the before rules must be enclosed with three asterisks before and after. the problem description between the parantheses be very much elaborate with details in explaining the problem and why it happened '''
+
+
+def build_assess_prompt(user_input):
+    return f"### System:\n{system_input}\n### User:\n{user_input}\n### Assistant:\n"
+
+def dispatch_assessment(response):
+    # No ***...*** block means nothing to extract or mail; skip the
+    # regex passes and return the same empty future list.
+    if '***' not in response:
+        return []
     queries = prompt_remover(response)
-    print(response)
-    print(queries)
+    logger.debug("response=%s", response)
+    logger.debug("queries=%s", queries)
+    futures = []
     for i in queries:
         task, content = extract_content(i)
         if (task=='official'):
-            sendmail('nabothdemetrius@gmail.com', 'Issue regarding customer service', content)
+            futures.append(_MAIL_POOL.submit(
+                sendmail, 'nabothdemetrius@gmail.com',
+                'Issue regarding customer service', content))
+    return futures
+
+def assess(user_input, model, tokenizer):
+    response = generate_response(model, tokenizer, system_input, user_input)
+    return dispatch_assessment(response)
             
             
@@ -1,28 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from gpt import HF_LLM
 from speech_brain_app import get_emotion
 from transcription import Transcriptor
-from mail import assess
+from mail import build_assess_prompt, dispatch_assessment
 
 class csi:
 
     def __init__(self,model_name,model,tokenizer):
-        self.gpt = HF_LLM(model_name)
+        self.gpt = HF_LLM(model_name, model=model, tokenizer=tokenizer)
         self.transcriptor = Transcriptor()
         self.model = model
         self.tokenizer = tokenizer
 
+    def _assess_and_generate(self, transcripts, emotions):
+        # Both prompts share the same transcripts, so run them as one
+        # batch of two and pay the prefill GEMMs once.
+        transcripts = self.gpt.condense(transcripts)
+        prompts = [build_assess_prompt(transcripts),
+                   self.gpt.build_prompt(transcripts, emotions)]
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+        enc = self.tokenizer(prompts, return_tensors="pt", padding=True,
+                             add_special_tokens=False).to(self.model.device)
+        outputs = self.model.generate(
+            **enc,
+            max_new_tokens=self.gpt.max_new_tokens,
+            use_cache=True,
+            do_sample=False,
+            num_beams=1,
+            pad_token_id=self.tokenizer.eos_token_id,
+        )
+        assessment, result = [
+            text.split("### Assistant:\n")[-1]
+            for text in self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        ]
+        dispatch_assessment(assessment)
+        return result
+
+    def _diarize_and_transcribe(self, audio, sample_rate=None):
+        # Emotion diarization and transcription are independent over the
+        # same audio; both spend their time in native code, so threads overlap.
+        if sample_rate is None:
+            transcribe_input = audio
+        else:
+            transcribe_input = {"raw": audio, "sampling_rate": sample_rate}
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            emotions_f = ex.submit(get_emotion, audio, sample_rate)
+            transcripts_f = ex.submit(self.transcriptor.transcribe, transcribe_input)
+            return emotions_f.result(), transcripts_f.result()
+
     def process(self, path):
-        emotions = get_emotion(path)
-        transcripts = self.transcriptor.transcribe(path)
-        assess(transcripts,self.model, self.tokenizer)
-        result = self.gpt.generate_response(transcripts, emotions)
+        emotions, transcripts = self._diarize_and_transcribe(path)
+        result = self._assess_and_generate(transcripts, emotions)
         return result
 
     def process_return_with_transcripts(self, audio):
-        emotions = get_emotion(audio)
-        transcripts = self.transcriptor.transcribe(audio)
-        assess(transcripts, self.model, self.tokenizer)
-        result = self.gpt.generate_response(transcripts, emotions)
+        emotions, transcripts = self._diarize_and_transcribe(audio)
+        result = self._assess_and_generate(transcripts, emotions)
+        return result,transcripts
+
+    def process_array_return_with_transcripts(self, audio, sample_rate):
+        # In-memory entry point: the decoded waveform goes straight to
+        # both models, with no temp file written or re-read.
+        emotions, transcripts = self._diarize_and_transcribe(audio, sample_rate)
+        result = self._assess_and_generate(transcripts, emotions)
         return result,transcripts
 
 
@@ -1,9 +1,27 @@
+from functools import lru_cache
+
+import torch
+
 from speechbrain.inference.diarization import Speech_Emotion_Diarization
 
-def get_emotion(audio):
-    classifier = Speech_Emotion_Diarization.from_hparams(source="speechbrain/emotion-diarization-wavlm-large")
-    diary = classifier.diarize_file(audio)
-    return diary
+@lru_cache(maxsize=1)
+def get_classifier():
+    return Speech_Emotion_Diarization.from_hparams(source="speechbrain/emotion-diarization-wavlm-large")
+
+def get_emotion(audio, sample_rate=None):
+    """Diarize emotions from a file path or an in-memory waveform.
+
+    When sample_rate is given, audio is treated as a 1-D waveform and
+    diarized directly, skipping the disk roundtrip.
+    """
+    classifier = get_classifier()
+    if sample_rate is None:
+        return classifier.diarize_file(audio)
+    waveform = torch.as_tensor(audio, dtype=torch.float32)
+    waveform = classifier.audio_normalizer(waveform, sample_rate)
+    batch = waveform.unsqueeze(0)
+    rel_length = torch.tensor([1.0])
+    return classifier.diarize_batch(batch, rel_length, ["stream"])
 
 #path = r"new.wav"
 #print(get_emotion(path))
@@ -1151,17 +1151,23 @@ class ScorerBuilder:
             score, new_memory[k] = impl.score(inp_tokens, memory[k], None, attn)
             log_probs += score * self.weights[k]
 
-        # select candidates from the results of full scorers for partial scorers
-        _, candidates = log_probs.topk(
-            int(beam_size * self.scorer_beam_scale), dim=-1
-        )
-
-        # score pruned tokens candidates
-        for k, impl in self.partial_scorers.items():
-            score, new_memory[k] = impl.score(
-                inp_tokens, memory[k], candidates, attn
+        # select candidates from the results of full scorers for partial
+        # scorers; the full-vocabulary topk is skipped entirely when no
+        # partial scorer is registered.
+        if self.partial_scorers:
+            # sorted=False: the candidates are a pruned token set, and
+            # every partial scorer scatters its scores back by token id,
+            # so the selection order never matters.
+            _, candidates = log_probs.topk(
+                int(beam_size * self.scorer_beam_scale), dim=-1, sorted=False
             )
-            log_probs += score * self.weights[k]
+
+            # score pruned tokens candidates
+            for k, impl in self.partial_scorers.items():
+                score, new_memory[k] = impl.score(
+                    inp_tokens, memory[k], candidates, attn
+                )
+                log_probs += score * self.weights[k]
 
         return log_probs, new_memory
 
@@ -7,14 +7,132 @@ Authors
  * Mirco Ravanelli 2020
  * Sung-Lin Yeh 2020
 """
+from typing import Optional
+
 import torch
 from speechbrain.decoders.utils import (
     inflate_tensor,
-    mask_by_condition,
     _update_mem,
 )
 from speechbrain.utils.data_utils import undo_padding
 
+# Resolved once at import; true -inf, used where a value must lose any
+# comparison (finished-score init, topk scratch pads) as opposed to the
+# searchers' finite minus_inf used for maskable scores.
+_NEG_INF = float("-inf")
+
+
+@torch.jit.script
+def _greedy_step_update(
+    log_probs: torch.Tensor, has_ended: torch.Tensor, eos_index: int
+):
+    """Pure-tensor inner update of the greedy loop, scripted so the op
+    dispatch runs without CPython frame overhead.
+
+    Returns the next input tokens, the masked per-step scores and
+    predictions, and the updated ended mask.
+    """
+    step_scores, step_preds = log_probs.max(dim=-1)
+    masked_scores = step_scores.masked_fill(has_ended, 0.0)
+    masked_preds = step_preds.masked_fill(has_ended, eos_index)
+    has_ended = has_ended | (step_preds == eos_index)
+    return step_preds, masked_scores, masked_preds, has_ended
+
+
+def _beam_topk_step(
+    scores_flat: torch.Tensor,
+    beam_size: int,
+    n_out: int,
+    n_out_padded: int,
+    n_out_shift: int,
+    n_out_mask: int,
+    beam_offset_unsq: torch.Tensor,
+):
+    """Topk and candidate-index math of the beam step, fused so the
+    chain of small pointwise ops after the topk runs without per-op
+    Python dispatch. Kept free of step-dependent scalars so a compiled
+    variant specializes once per decode instead of once per step.
+
+    Returns the raw summed scores, the candidates re-expressed against
+    the true vocabulary width, the predecessors and the next input
+    tokens.
+    """
+    raw_scores, candidates = scores_flat.topk(
+        beam_size, dim=-1, sorted=False
+    )
+    # For a power-of-two padded width (n_out_shift >= 0) the unflatten
+    # lowers to shift and mask instead of integer div and mod.
+    if n_out_shift >= 0:
+        tokens = candidates & n_out_mask
+        predecessors_local = candidates >> n_out_shift
+    else:
+        tokens = candidates % n_out_padded
+        predecessors_local = torch.div(
+            candidates, n_out_padded, rounding_mode="floor"
+        )
+    inp_tokens = tokens.reshape(-1)
+    raw_scores = raw_scores.reshape(-1)
+    candidates = predecessors_local * n_out + tokens
+    # beam_offset comes pre-unsqueezed; in-place add reuses the
+    # floor-div output now that candidates has been derived from it.
+    # predecessors only ever feeds index_select, which accepts int32;
+    # the narrower indices halve the index-read bandwidth when the
+    # decoder and scorer memories are permuted each step. candidates
+    # stays int64 because it is consumed by gather.
+    predecessors = (
+        predecessors_local.add_(beam_offset_unsq)
+        .reshape(-1)
+        .to(torch.int32)
+    )
+    return raw_scores, candidates, predecessors, inp_tokens
+
+
+def _mask_log_probs_step(
+    log_probs: torch.Tensor,
+    attn: Optional[torch.Tensor],
+    prev_attn_peak: torch.Tensor,
+    block_eos: bool,
+    eos_index: int,
+    eos_threshold: float,
+    max_attn_shift: int,
+    using_max_attn_shift: bool,
+    using_eos_threshold: bool,
+    minus_inf: float,
+):
+    """Fusion of the per-step log-prob masks: the max-attn-shift row
+    block, the minimum-decode-steps eos block and the eos-threshold
+    block run as one call instead of three dispatched methods. All
+    fills are in place; the eos column is written at most once, and
+    while block_eos forces the column down anyway the threshold test
+    (a full vocabulary reduction) is skipped. The caller resolves the
+    step count into block_eos so the function only sees booleans and a
+    compiled variant specializes at most twice per decode.
+
+    Returns the masked log-probabilities and the attention peaks.
+    """
+    if using_max_attn_shift and attn is not None:
+        # Block the candidates that exceed the max shift with a single
+        # abs-delta compare against the previous attention peak.
+        attn_peak = torch.argmax(attn, dim=1)
+        delta = (attn_peak - prev_attn_peak).abs()
+        cond = (delta <= max_attn_shift).unsqueeze(1)
+        log_probs.masked_fill_(~cond, minus_inf)
+        prev_attn_peak = attn_peak
+    if block_eos:
+        log_probs[:, eos_index] = minus_inf
+    elif using_eos_threshold:
+        max_probs, _ = torch.max(log_probs, dim=-1)
+        keep = log_probs[:, eos_index] > (eos_threshold * max_probs)
+        log_probs[:, eos_index].masked_fill_(~keep, minus_inf)
+    return log_probs, prev_attn_peak
+
+
+# The scripted variants are the default execution mode; __init__ can
+# swap in torch.compile'd variants of the plain functions instead
+# (see compile_step_fns).
+_beam_topk_step_scripted = torch.jit.script(_beam_topk_step)
+_mask_log_probs_step_scripted = torch.jit.script(_mask_log_probs_step)
+
 
 class AlivedHypotheses(torch.nn.Module):
     """ This class handle the data for the hypotheses during the decoding.
@@ -38,6 +156,44 @@ class AlivedHypotheses(torch.nn.Module):
         self.sequence_scores = sequence_scores
 
 
+class FinishedHypotheses(torch.nn.Module):
+    """ This class stores the hypotheses that have reached eos.
+
+    The hypotheses live in padded (batch_size, beam_size, max_len)
+    buffers written in place when a beam reaches eos, instead of
+    per-batch Python lists of variable-length tensors, so storing a
+    finished hypothesis allocates nothing.
+
+    Arguments
+    ---------
+    batch_size : int
+        The number of utterances in the batch.
+    beam_size : int
+        The width of beam.
+    max_len : int
+        The maximum decoding length.
+    device : torch.device
+        The device on which the search runs.
+    """
+
+    def __init__(self, batch_size, beam_size, max_len, device):
+        super().__init__()
+        self.hyps = torch.zeros(
+            batch_size, beam_size, max_len, dtype=torch.long, device=device
+        )
+        self.log_probs = torch.zeros(
+            batch_size, beam_size, max_len, device=device
+        )
+        self.scores = torch.full(
+            (batch_size, beam_size), _NEG_INF, device=device
+        )
+        self.lengths = torch.zeros(
+            batch_size, beam_size, dtype=torch.long, device=device
+        )
+        # number of filled slots per batch element
+        self.counts = [0 for _ in range(batch_size)]
+
+
 class S2SBaseSearcher(torch.nn.Module):
     """S2SBaseSearcher class to be inherited by other
     decoding approaches for seq2seq model.
@@ -152,6 +308,7 @@ class S2SGreedySearcher(S2SBaseSearcher):
     greedy decoding approach. See also S2SBaseSearcher().
     """
 
+    @torch.inference_mode()
     def forward(self, enc_states, wav_len):
         """This method performs a greedy search.
 
@@ -180,11 +337,10 @@ class S2SGreedySearcher(S2SBaseSearcher):
         memory = self.reset_mem(batch_size, device=device)
 
         # Using bos as the first input
-        inp_tokens = (
-            enc_states.new_zeros(batch_size).fill_(self.bos_index).long()
+        inp_tokens = torch.full(
+            (batch_size,), self.bos_index, dtype=torch.long, device=device
         )
 
-        log_probs_lst = []
         max_decode_steps = int(enc_states.shape[1] * self.max_decode_ratio)
 
         # the decoding steps can be based on the max number of tokens that a decoder can process
@@ -193,30 +349,43 @@ class S2SGreedySearcher(S2SBaseSearcher):
             0, max_decode_steps
         )
 
-        has_ended = enc_states.new_zeros(batch_size).bool()
-        for _ in range(max_decode_steps):
+        # Only the winning token and its score are ever read downstream, so
+        # store those per step instead of stacking (B, T, V) log-probs.
+        scores_buf = enc_states.new_empty(batch_size, max_decode_steps)
+        preds_buf = torch.empty(
+            batch_size, max_decode_steps, dtype=torch.long, device=device
+        )
+
+        has_ended = torch.zeros(batch_size, dtype=torch.bool, device=device)
+        n_steps = 0
+        for t in range(max_decode_steps):
             log_probs, memory, _ = self.forward_step(
                 inp_tokens, memory, enc_states, enc_lens
             )
-            log_probs_lst.append(log_probs)
-            inp_tokens = log_probs.argmax(dim=-1)
-            log_probs[has_ended] = float("inf")
-            has_ended = has_ended | (inp_tokens == self.eos_index)
-            if has_ended.all():
+            (
+                inp_tokens,
+                step_scores,
+                step_preds,
+                has_ended,
+            ) = _greedy_step_update(log_probs, has_ended, self.eos_index)
+            scores_buf[:, t] = step_scores
+            preds_buf[:, t] = step_preds
+            n_steps = t + 1
+            # has_ended.all() is a device-to-host sync that serializes the
+            # launcher with the device; poll it every 8 steps instead of
+            # every step. Ended rows keep emitting masked eos meanwhile.
+            if (t & 7) == 7 and bool(has_ended.all()):
                 break
 
-        log_probs = torch.stack(log_probs_lst, dim=1)
-        scores, predictions = log_probs.max(dim=-1)
-        mask = scores == float("inf")
-        scores[mask] = 0
-        predictions[mask] = self.eos_index
+        scores = scores_buf[:, :n_steps]
+        predictions = preds_buf[:, :n_steps]
 
         (
             top_hyps,
             top_lengths,
             top_scores,
             top_log_probs,
-        ) = self._get_top_prediction(predictions, scores, log_probs)
+        ) = self._get_top_prediction(predictions, scores, scores)
 
         # Convert best hypothesis to list
         hyps = undo_padding(top_hyps[:, 0], top_lengths)
@@ -246,20 +415,17 @@ class S2SGreedySearcher(S2SBaseSearcher):
         top_log_probs : torch.Tensor (batch, max length of token_id sequences)
             The log probabilities of each hypotheses.
         """
-        batch_size = hyps.size(0)
         max_length = hyps.size(1)
-        top_lengths = [max_length] * batch_size
-
-        # Collect lengths of top hyps
-        for pred_index in range(batch_size):
-            pred = hyps[pred_index]
-            pred_length = (pred == self.eos_index).nonzero(as_tuple=False)
-            if len(pred_length) > 0:
-                top_lengths[pred_index] = pred_length[0].item()
-        # Convert lists to tensors
-        top_lengths = torch.tensor(
-            top_lengths, dtype=torch.float, device=hyps.device
-        )
+
+        # Collect lengths of top hyps in a single kernel: the first eos
+        # position per row, or max_length when no eos was emitted. This
+        # avoids one device sync per batch element.
+        eos_mask = hyps == self.eos_index
+        has_eos = eos_mask.any(dim=1)
+        first_eos = eos_mask.float().argmax(dim=1)
+        top_lengths = torch.where(
+            has_eos, first_eos, torch.full_like(first_eos, max_length)
+        ).float()
 
         # Pick top log probabilities
         top_log_probs = log_probs
@@ -321,7 +487,6 @@ class S2SRNNGreedySearcher(S2SGreedySearcher):
         self.emb = embedding
         self.dec = decoder
         self.fc = linear
-        self.softmax = torch.nn.LogSoftmax(dim=-1)
 
     def reset_mem(self, batch_size, device):
         """When doing greedy search, keep hidden state (hs) and context vector (c)
@@ -339,7 +504,9 @@ class S2SRNNGreedySearcher(S2SGreedySearcher):
         dec_out, hs, c, w = self.dec.forward_step(
             e, hs, c, enc_states, enc_lens
         )
-        log_probs = self.softmax(self.fc(dec_out))
+        # Functional log_softmax writes straight from the fc output
+        # instead of going through a module and a second (B, V) buffer.
+        log_probs = torch.nn.functional.log_softmax(self.fc(dec_out), dim=-1)
         return log_probs, (hs, c), w
 
 
@@ -382,6 +549,17 @@ class S2SBeamSearcher(S2SBaseSearcher):
     minus_inf : float
         The value of minus infinity to block some path
         of the search. Default: -1e20.
+    bf16_log_probs : bool
+        Whether to keep the per-step log-probabilities in bfloat16. The
+        (n_bh, vocab) log_probs tensor dominates the memory traffic of a
+        beam step; bfloat16 halves it while the accumulated
+        sequence_scores stay in fp32. Default: False.
+    compile_step_fns : bool
+        Whether to run the fused per-step helpers (topk decode and
+        log-prob masking) through torch.compile(dynamic=False,
+        mode="reduce-overhead") instead of TorchScript. Shapes are
+        stable within a decode, so the compile cache hits for every
+        step after warm-up. Default: False.
     """
 
     def __init__(
@@ -400,6 +578,8 @@ class S2SBeamSearcher(S2SBaseSearcher):
         using_max_attn_shift=False,
         max_attn_shift=60,
         minus_inf=-1e20,
+        bf16_log_probs=False,
+        compile_step_fns=False,
     ):
         super(S2SBeamSearcher, self).__init__(
             bos_index, eos_index, min_decode_ratio, max_decode_ratio,
@@ -416,6 +596,31 @@ class S2SBeamSearcher(S2SBaseSearcher):
         self.attn_weight = 1.0
         self.ctc_weight = 0.0
         self.minus_inf = minus_inf
+        self.bf16_log_probs = bf16_log_probs
+        # Batch compaction needs every row-shaped tensor to be re-sliced
+        # when utterances finish; searchers whose decoder caches
+        # row-shaped state internally opt out.
+        self._supports_batch_compaction = True
+        # Start-of-decode tensors reused across calls with the same
+        # geometry (see init_beam_search_data). A single template set,
+        # rebuilt when the batch size or device changes: under dynamic
+        # batching a grow-only cache would pin one scratch buffer per
+        # batch size ever seen.
+        self._init_cache = None
+        self._init_cache_key = None
+        # Both helpers are free of step-dependent scalars, so the
+        # compiled variants specialize on the decode geometry once
+        # instead of recompiling per step.
+        if compile_step_fns:
+            self._beam_topk_fn = torch.compile(
+                _beam_topk_step, dynamic=False, mode="reduce-overhead"
+            )
+            self._mask_log_probs_fn = torch.compile(
+                _mask_log_probs_step, dynamic=False, mode="reduce-overhead"
+            )
+        else:
+            self._beam_topk_fn = _beam_topk_step_scripted
+            self._mask_log_probs_fn = _mask_log_probs_step_scripted
 
         if self.scorer is not None:
             # Check length normalization
@@ -443,78 +648,42 @@ class S2SBeamSearcher(S2SBaseSearcher):
 
         Arguments
         ---------
-        hyps : List
-            This list contains batch_size number.
-            Each inside list contains a list stores all the hypothesis for this sentence.
+        hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
 
         Returns
         -------
         bool
             Whether the hyps has been full.
         """
-        hyps_len = [len(lst) for lst in hyps]
-        beams_size = [self.beam_size for _ in range(len(hyps_len))]
-        return hyps_len == beams_size
-
-    def _check_attn_shift(self, attn, prev_attn_peak):
-        """This method checks whether attention shift is more than attn_shift.
-
-        Arguments
-        ---------
-        attn : torch.Tensor
-            The attention to be checked.
-        prev_attn_peak : torch.Tensor
-            The previous attention peak place.
-
-        Returns
-        -------
-        cond : torch.BoolTensor
-            Each element represents whether the beam is within the max_shift range.
-        attn_peak : torch.Tensor
-            The peak of the attn tensor.
-        """
-        # Block the candidates that exceed the max shift
-        _, attn_peak = torch.max(attn, dim=1)
-        lt_cond = attn_peak <= (prev_attn_peak + self.max_attn_shift)
-        mt_cond = attn_peak > (prev_attn_peak - self.max_attn_shift)
-
-        # True if not exceed limit
-        # Multiplication equals to element-wise and for tensor
-        cond = (lt_cond * mt_cond).unsqueeze(1)
-        return cond, attn_peak
-
-    def _check_eos_threshold(self, log_probs):
-        """This method checks whether eos log-probabilities exceed threshold.
-
-        Arguments
-        ---------
-        log_probs : torch.Tensor
-            The log-probabilities.
-
-        Returns
-        ------
-        cond : torch.BoolTensor
-            Each element represents whether the eos log-probabilities will be kept.
-        """
-        max_probs, _ = torch.max(log_probs, dim=-1)
-        eos_probs = log_probs[:, self.eos_index]
-        cond = eos_probs > (self.eos_threshold * max_probs)
-        return cond
+        # The count is maintained as batches fill up, so this is O(1)
+        # instead of rebuilding two batch-sized lists every step.
+        return self._n_full_batches == len(hyps.counts)
 
     def init_hypotheses(self):
         """This method initializes the AlivedHypotheses object.
 
+        The sequence and log-prob buffers are preallocated at the maximum
+        decoding length and written in place each step; only the first
+        `step + 1` columns are valid at a given step.
+
         Returns
         -------
         AlivedHypotheses
             The alived hypotheses filled with the initial values.
         """
+        self._hyp_length = 0
         return AlivedHypotheses(
-            alived_seq=torch.empty(self.n_bh, 0, device=self.device).long(),
-            alived_log_probs=torch.empty(self.n_bh, 0, device=self.device),
-            sequence_scores=torch.empty(self.n_bh, device=self.device)
-            .fill_(float("-inf"))
-            .index_fill_(0, self.beam_offset, 0.0),
+            alived_seq=torch.zeros(
+                self.n_bh, self.max_decode_steps, device=self.device
+            ).long(),
+            alived_log_probs=torch.zeros(
+                self.n_bh, self.max_decode_steps, device=self.device
+            ),
+            # Shared read-only template: the searcher replaces
+            # sequence_scores with the topk output on the first step, so
+            # the initial values are never written in place.
+            sequence_scores=self._seq_scores_template,
         )
 
     def _attn_weight_step(
@@ -555,33 +724,6 @@ class S2SBeamSearcher(S2SBaseSearcher):
             log_probs = self.attn_weight * log_probs
         return log_probs, memory, attn
 
-    def _max_attn_shift_step(self, attn, prev_attn_peak, log_probs):
-        """This method will block the beams that attention shift more
-        than max_attn_shift.
-
-        Arguments
-        ---------
-        attn : torch.Tensor
-            The attention weight.
-        prev_attn_peak : torch.Tensor
-            The previous attention peak place.
-        log_probs : torch.Tensor
-            The log-probabilities of the current step output.
-
-        Returns
-        -------
-        log_probs : torch.Tensor
-            Log-probabilities of the current step output.
-        prev_attn_peak : torch.Tensor
-            The previous attention peak place.
-        """
-        if self.using_max_attn_shift:
-            cond, prev_attn_peak = self._check_attn_shift(attn, prev_attn_peak)
-            log_probs = mask_by_condition(
-                log_probs, cond, fill_value=self.minus_inf
-            )
-        return log_probs, prev_attn_peak
-
     def _scorer_step(self, inp_tokens, scorer_memory, attn, log_probs):
         """This method call the scorers if scorer is not None.
 
@@ -610,47 +752,6 @@ class S2SBeamSearcher(S2SBaseSearcher):
             )
         return log_probs, scorer_memory
 
-    def _set_eos_minus_inf_step(self, log_probs, step, min_decode_steps):
-        """This method set the log_probs of eos to minus infinity if the step is less than min_decode_steps.
-
-        Arguments
-        ---------
-        log_probs : torch.Tensor
-            The log-probabilities of the current step output.
-        step : int
-            The current decoding step.
-        min_decode_steps : int
-            The minimum decoding steps.
-
-        Returns
-        -------
-        log_probs : torch.Tensor
-            Log-probabilities of the current step output.
-        """
-        if step < min_decode_steps:
-            log_probs[:, self.eos_index] = self.minus_inf
-        return log_probs
-
-    def _eos_threshold_step(self, log_probs):
-        """This method set the log_probs of eos to minus infinity if the eos log-probabilities is less than eos_threshold.
-
-        Arguments
-        ---------
-        log_probs : torch.Tensor
-            The log-probabilities of the current step output.
-
-        Returns
-        -------
-        log_probs : torch.Tensor
-            Log-probabilities of the current step output.
-        """
-        if self.using_eos_threshold:
-            cond = self._check_eos_threshold(log_probs)
-            log_probs[:, self.eos_index] = mask_by_condition(
-                log_probs[:, self.eos_index], cond, fill_value=self.minus_inf,
-            )
-        return log_probs
-
     def _attn_weight_permute_memory_step(self, memory, predecessors):
         """This method permute the memory if attn_weight is superior to 0.
 
@@ -785,7 +886,7 @@ class S2SBeamSearcher(S2SBaseSearcher):
         return memory, scorer_memory, prev_attn_peak
 
     def _update_sequences_and_log_probs(
-        self, log_probs, inp_tokens, predecessors, candidates, alived_hyps,
+        self, log_probs, inp_tokens, predecessors, candidates, alived_hyps, step,
     ):
         """This method update sequences and log probabilities by adding the new inp_tokens.
 
@@ -801,38 +902,34 @@ class S2SBeamSearcher(S2SBaseSearcher):
             The index of the current top-K output.
         alived_hyps : AlivedHypotheses
             The alived hypotheses.
+        step : int
+            The current decoding step.
 
         Returns
         -------
         alived_hyps : AlivedHypotheses
             The alived hypotheses.
         """
-        # Update alived_seq
-        alived_hyps.alived_seq = torch.cat(
-            [
-                torch.index_select(
-                    alived_hyps.alived_seq, dim=0, index=predecessors
-                ),
-                inp_tokens.unsqueeze(1),
-            ],
-            dim=-1,
-        )
+        # Permute the past and write the new token into the preallocated
+        # buffers instead of re-allocating a grown tensor with cat.
+        if step > 0:
+            alived_hyps.alived_seq[:, :step] = torch.index_select(
+                alived_hyps.alived_seq[:, :step], dim=0, index=predecessors
+            )
+        alived_hyps.alived_seq[:, step] = inp_tokens
 
         # Takes the log-probabilities
-        beam_log_probs = log_probs[
-            torch.arange(self.batch_size).unsqueeze(1), candidates
-        ].reshape(self.n_bh)
-
-        # Update alived_log_probs
-        alived_hyps.alived_log_probs = torch.cat(
-            [
-                torch.index_select(
-                    alived_hyps.alived_log_probs, dim=0, index=predecessors
-                ),
-                beam_log_probs.unsqueeze(1),
-            ],
-            dim=-1,
-        )
+        beam_log_probs = log_probs.gather(1, candidates).reshape(self.n_bh)
+
+        if step > 0:
+            alived_hyps.alived_log_probs[:, :step] = torch.index_select(
+                alived_hyps.alived_log_probs[:, :step],
+                dim=0,
+                index=predecessors,
+            )
+        alived_hyps.alived_log_probs[:, step] = beam_log_probs
+
+        self._hyp_length = step + 1
 
         return alived_hyps
 
@@ -861,35 +958,45 @@ class S2SBeamSearcher(S2SBaseSearcher):
         alived_hyps : AlivedHypotheses
             The alived hypotheses.
         """
-        scores = alived_hyps.sequence_scores.unsqueeze(1).expand(-1, self.n_out)
-        scores = scores + log_probs
-
-        # length normalization
-        if self.length_normalization:
-            scores = scores / (step + 1)
-
-        # keep topk beams
-        scores, candidates = scores.view(self.batch_size, -1).topk(
-            self.beam_size, dim=-1
+        # Broadcast-add into the true columns of a scratch buffer
+        # registered once per decode, instead of materializing a fresh
+        # (n_bh, n_out) tensor every step. The buffer's vocabulary axis
+        # is padded to a SIMD-friendly width; the pad columns hold
+        # minus_inf and can never win the topk.
+        scores = torch.add(
+            log_probs,
+            alived_hyps.sequence_scores.unsqueeze(1),
+            out=self._scores_scratch[:, : self.n_out],
         )
 
-        # The input for the next step, also the output of current step.
-        inp_tokens = (candidates % self.n_out).view(self.n_bh)
-
-        scores = scores.view(self.n_bh)
-        alived_hyps.sequence_scores = scores
+        # keep topk beams and decode the winning indices in one fused
+        # call (see _beam_topk_step): unsorted topk over the aligned
+        # padded width, predecessors/candidates from fused pointwise
+        # index math.
+        (
+            raw_scores,
+            candidates,
+            predecessors,
+            inp_tokens,
+        ) = self._beam_topk_fn(
+            self._scores_scratch.view(self.batch_size, -1),
+            self.beam_size,
+            self.n_out,
+            self._n_out_padded,
+            self._n_out_shift,
+            self._n_out_mask,
+            self._beam_offset_unsq,
+        )
 
-        # recover the length normalization
+        # Length normalization is applied to the winners only; a
+        # uniform scalar divide cannot change the within-step order.
         if self.length_normalization:
-            alived_hyps.sequence_scores = alived_hyps.sequence_scores * (
-                step + 1
-            )
+            scores = raw_scores / (step + 1)
+        else:
+            scores = raw_scores
 
-        # The index of which beam the current top-K output came from in (t-1) steps.
-        predecessors = (
-            torch.div(candidates, self.n_out, rounding_mode="floor")
-            + self.beam_offset.unsqueeze(1).expand_as(candidates)
-        ).view(self.n_bh)
+        # sequence_scores keeps accumulating the raw log-prob sums.
+        alived_hyps.sequence_scores = raw_scores
 
         return (
             scores,
@@ -917,8 +1024,8 @@ class S2SBeamSearcher(S2SBaseSearcher):
             The input tensor of the current step.
         log_probs : torch.Tensor
             The log-probabilities of the current step output.
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
         memory : No limit
             The memory variables generated in this step.
         scorer_memory : No limit
@@ -943,31 +1050,97 @@ class S2SBeamSearcher(S2SBaseSearcher):
         memory, scorer_memory = self._update_reset_memory(enc_states, enc_lens)
 
         # Inflate the enc_states and enc_len by beam_size times
+        # The encoder states are replicated beam_size times because every
+        # decoder/attention implementation consumes row-aligned
+        # (batch * beam, T, D) keys. Sharing one (batch, T, D) copy across
+        # beams would need a broadcast-aware attention path in the RNN and
+        # Transformer decoders themselves; until then the copy stays.
         enc_states = inflate_tensor(enc_states, times=self.beam_size, dim=0)
         enc_lens = inflate_tensor(enc_lens, times=self.beam_size, dim=0)
 
+        self._n_out_padded = (self.n_out + 63) // 64 * 64
+        # Shift/mask unflatten when the padded width is a power of two.
+        if self._n_out_padded & (self._n_out_padded - 1) == 0:
+            self._n_out_shift = self._n_out_padded.bit_length() - 1
+        else:
+            self._n_out_shift = -1
+        self._n_out_mask = self._n_out_padded - 1
+
+        # The start-of-decode tensors only depend on the batch geometry
+        # and the device, so streaming workloads (many short utterances)
+        # reuse them instead of reallocating every call. The read-only
+        # ones (bos input, offsets, initial scores) are shared as-is; the
+        # working ones (initial log_probs, scores scratch) keep their
+        # allocation and are re-zeroed.
+        cache_key = (self.batch_size, self.device)
+        if self._init_cache_key != cache_key:
+            beam_offset = (
+                torch.arange(self.batch_size, device=self.device)
+                * self.beam_size
+            )
+            # initialize sequence scores variables: keep only the first
+            # beam of each sentence alive to make sure no redundancy.
+            # minus_inf rather than -inf, for the same reason as the eos
+            # masking in search_step: blocked rows must stay strictly
+            # above the -inf pad columns of the scratch.
+            sequence_scores = torch.empty(
+                self.n_bh, device=self.device
+            ).fill_(self.minus_inf)
+            sequence_scores.index_fill_(0, beam_offset, 0.0)
+            scores_scratch = torch.empty(
+                self.n_bh, self._n_out_padded, device=self.device
+            )
+            if self._n_out_padded != self.n_out:
+                # The pads hold -inf while blocked rows are masked with
+                # the finite minus_inf, so every real column strictly
+                # beats a pad and the topk can never return an
+                # out-of-vocabulary index.
+                scores_scratch[:, self.n_out :].fill_(_NEG_INF)
+            templates = {
+                "inp_tokens": torch.full(
+                    (self.n_bh,),
+                    self.bos_index,
+                    dtype=torch.long,
+                    device=self.device,
+                ),
+                "beam_offset": beam_offset,
+                "beam_offset_unsq": beam_offset.unsqueeze(1),
+                "beam_arange": torch.arange(
+                    self.beam_size, device=self.device
+                ),
+                "sequence_scores": sequence_scores,
+                "prev_attn_peak": torch.zeros(self.n_bh, device=self.device),
+                "log_probs": torch.zeros(
+                    self.n_bh, self.n_out, device=self.device
+                ),
+                "scores_scratch": scores_scratch,
+            }
+            self._init_cache = templates
+            self._init_cache_key = cache_key
+        else:
+            templates = self._init_cache
+            templates["log_probs"].zero_()
+
         # Using bos as the first input
-        inp_tokens = (
-            torch.zeros(self.n_bh, device=self.device)
-            .fill_(self.bos_index)
-            .long()
-        )
+        inp_tokens = templates["inp_tokens"]
 
         # The first index of each sentence.
-        self.beam_offset = (
-            torch.arange(self.batch_size, device=self.device) * self.beam_size
-        )
+        self.beam_offset = templates["beam_offset"]
+        self._beam_offset_unsq = templates["beam_offset_unsq"]
 
-        # initialize sequence scores variables.
-        sequence_scores = torch.empty(self.n_bh, device=self.device).fill_(
-            self.minus_inf
-        )
+        # number of batch elements whose beam is full.
+        self._n_full_batches = 0
 
-        # keep only the first to make sure no redundancy.
-        sequence_scores.index_fill_(0, self.beam_offset, 0.0)
+        # mapping from the active (possibly compacted) batch positions to
+        # the original batch indices.
+        self._orig_batch_size = self.batch_size
+        self._active_batch_ids = list(range(self.batch_size))
 
-        # keep the hypothesis that reaches eos and their corresponding score and log_probs.
-        eos_hyps_and_log_probs_scores = [[] for _ in range(self.batch_size)]
+        # Step-invariant index tensors, reused by the compaction/restore
+        # paths instead of fresh aranges.
+        self._beam_arange = templates["beam_arange"]
+        self._orig_beam_offset = self.beam_offset
+        self._seq_scores_template = templates["sequence_scores"]
 
         self.min_decode_steps = int(enc_states.shape[1] * self.min_decode_ratio)
         self.max_decode_steps = int(enc_states.shape[1] * self.max_decode_ratio)
@@ -981,12 +1154,24 @@ class S2SBeamSearcher(S2SBaseSearcher):
             self.min_decode_steps, self.max_decode_steps
         )
 
+        # keep the hypothesis that reaches eos and their corresponding score
+        # and log_probs, packed in preallocated padded buffers.
+        finished_hyps = FinishedHypotheses(
+            self.batch_size, self.beam_size, self.max_decode_steps, self.device
+        )
+
         # Initialize the previous attention peak to zero
         # This variable will be used when using_max_attn_shift=True
-        prev_attn_peak = torch.zeros(self.n_bh, device=self.device)
+        prev_attn_peak = templates["prev_attn_peak"]
         attn = None
 
-        log_probs = torch.full((self.n_bh, self.n_out), 0.0, device=self.device)
+        log_probs = templates["log_probs"]
+
+        # Scratch buffer for the per-step beam scores, reused across
+        # steps. Its vocabulary axis is rounded up to a multiple of 64 so
+        # the topk reduces over an aligned width; the pad columns are
+        # filled with -inf once and never written afterwards.
+        self._scores_scratch = templates["scores_scratch"]
 
         alived_hyps = self.init_hypotheses()
 
@@ -994,7 +1179,7 @@ class S2SBeamSearcher(S2SBaseSearcher):
             alived_hyps,
             inp_tokens,
             log_probs,
-            eos_hyps_and_log_probs_scores,
+            finished_hyps,
             memory,
             scorer_memory,
             attn,
@@ -1004,7 +1189,7 @@ class S2SBeamSearcher(S2SBaseSearcher):
         )
 
     def _update_hyps_and_scores_if_eos_token(
-        self, inp_tokens, alived_hyps, eos_hyps_and_log_probs_scores, scores,
+        self, inp_tokens, alived_hyps, finished_hyps, scores,
     ):
         """This method will update hyps and scores if inp_tokens are eos.
 
@@ -1015,8 +1200,8 @@ class S2SBeamSearcher(S2SBaseSearcher):
         alived_hyps : AlivedHypotheses
             alived_seq : torch.Tensor
             alived_log_probs : torch.Tensor
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
         scores : torch.Tensor
             Scores at the current step.
 
@@ -1030,33 +1215,77 @@ class S2SBeamSearcher(S2SBaseSearcher):
 
         # Store the hypothesis and their scores when reaching eos.
         if eos_indices.shape[0] > 0:
-            for index in eos_indices:
-                # convert to int
-                index = index.item()
-                batch_id = torch.div(
-                    index, self.beam_size, rounding_mode="floor"
-                )
-                if (
-                    len(eos_hyps_and_log_probs_scores[batch_id])
-                    == self.beam_size
-                ):
+            # One device-to-host transfer for the slot bookkeeping
+            # instead of an .item() sync per finished hypothesis.
+            src_rows, dst_batch, dst_slot = [], [], []
+            for index in eos_indices.tolist():
+                # Map back to the original batch position in case the
+                # active batch has been compacted.
+                batch_id = self._active_batch_ids[index // self.beam_size]
+                slot = finished_hyps.counts[batch_id]
+                if slot == self.beam_size:
                     continue
-                hyp = alived_hyps.alived_seq[index, :]
-                log_probs = alived_hyps.alived_log_probs[index, :]
-                final_scores = scores[index].clone()
-                eos_hyps_and_log_probs_scores[batch_id].append(
-                    (hyp, log_probs, final_scores)
+                src_rows.append(index)
+                dst_batch.append(batch_id)
+                dst_slot.append(slot)
+                finished_hyps.counts[batch_id] = slot + 1
+                if slot + 1 == self.beam_size:
+                    self._n_full_batches += 1
+            if src_rows:
+                self._store_finished_rows(
+                    alived_hyps,
+                    finished_hyps,
+                    scores,
+                    src_rows,
+                    dst_batch,
+                    dst_slot,
                 )
 
         return is_eos
 
-    def _get_topk_prediction(self, eos_hyps_and_log_probs_scores):
+    def _store_finished_rows(
+        self, alived_hyps, finished_hyps, scores, src_rows, dst_batch, dst_slot,
+    ):
+        """Copy finishing rows of the alive buffers into the
+        preallocated finished storage at once: the alive buffers are
+        permuted in place on later steps, so the stored hypotheses must
+        be snapshots.
+
+        Arguments
+        ---------
+        alived_hyps : AlivedHypotheses
+            The alived hypotheses.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
+        scores : torch.Tensor
+            Scores at the current step.
+        src_rows : list of int
+            The rows of the alive buffers to store.
+        dst_batch : list of int
+            The destination batch index of each row.
+        dst_slot : list of int
+            The destination beam slot of each row.
+        """
+        length = self._hyp_length
+        rows = torch.tensor(src_rows, device=self.device)
+        batch = torch.tensor(dst_batch, device=self.device)
+        slot = torch.tensor(dst_slot, device=self.device)
+        finished_hyps.hyps[batch, slot, :length] = (
+            alived_hyps.alived_seq[:, :length].index_select(0, rows)
+        )
+        finished_hyps.log_probs[batch, slot, :length] = (
+            alived_hyps.alived_log_probs[:, :length].index_select(0, rows)
+        )
+        finished_hyps.scores[batch, slot] = scores.index_select(0, rows)
+        finished_hyps.lengths[batch, slot] = length
+
+    def _get_topk_prediction(self, finished_hyps):
         """This method sorts the scores and return corresponding hypothesis and log probs.
 
         Arguments
         ---------
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
 
         Returns
         -------
@@ -1069,46 +1298,26 @@ class S2SBeamSearcher(S2SBaseSearcher):
         topk_log_probs : torch.Tensor (batch, topk, max length of token_id sequences)
             The log probabilities of each hypotheses.
         """
-        top_hyps, top_log_probs, top_scores, top_lengths = [], [], [], []
-        batch_size = len(eos_hyps_and_log_probs_scores)
-
-        # Collect hypotheses
-        for i in range(len(eos_hyps_and_log_probs_scores)):
-            hyps, log_probs, scores = zip(*eos_hyps_and_log_probs_scores[i])
-            top_hyps += hyps
-            top_scores += scores
-            top_log_probs += log_probs
-            top_lengths += [len(hyp) for hyp in hyps]
-
-        # Convert lists to tensors
-        top_hyps = torch.nn.utils.rnn.pad_sequence(
-            top_hyps, batch_first=True, padding_value=0
-        )
-        top_log_probs = torch.nn.utils.rnn.pad_sequence(
-            top_log_probs, batch_first=True, padding_value=0
-        )
-        top_lengths = torch.tensor(
-            top_lengths, dtype=torch.float, device=top_hyps.device
-        )
-        top_scores = torch.stack((top_scores), dim=0).view(batch_size, -1)
+        batch_size = len(finished_hyps.counts)
+
+        # The hypotheses are already packed in padded (batch, beam, max_len)
+        # buffers: trim to the longest stored hypothesis and gather the
+        # winners along the beam axis, with no flattening or offset math.
+        max_len = int(finished_hyps.lengths.max())
+        top_hyps = finished_hyps.hyps[:, :, :max_len]
+        top_log_probs = finished_hyps.log_probs[:, :, :max_len]
 
         # Use SpeechBrain style lengths
-        top_lengths = (top_lengths - 1).abs() / top_hyps.size(1)
+        top_lengths = (finished_hyps.lengths.float() - 1).abs() / max_len
 
-        # Get topk indices
-        topk_scores, indices = top_scores.topk(self.topk, dim=-1)
-        indices = (indices + self.beam_offset.unsqueeze(1)).view(
-            batch_size * self.topk
+        # Get topk indices and select the hypotheses
+        topk_scores, indices = finished_hyps.scores.topk(self.topk, dim=-1)
+        topk_lengths = top_lengths.gather(1, indices)
+        indices = indices.unsqueeze(-1).expand(
+            batch_size, self.topk, max_len
         )
-        # Select topk hypotheses
-        topk_hyps = torch.index_select(top_hyps, dim=0, index=indices,)
-        topk_hyps = topk_hyps.view(batch_size, self.topk, -1)
-        topk_lengths = torch.index_select(top_lengths, dim=0, index=indices,)
-        topk_lengths = topk_lengths.view(batch_size, self.topk)
-        topk_log_probs = torch.index_select(
-            top_log_probs, dim=0, index=indices,
-        )
-        topk_log_probs = topk_log_probs.view(batch_size, self.topk, -1)
+        topk_hyps = top_hyps.gather(1, indices)
+        topk_log_probs = top_log_probs.gather(1, indices)
 
         return topk_hyps, topk_lengths, topk_scores, topk_log_probs
 
@@ -1117,7 +1326,7 @@ class S2SBeamSearcher(S2SBaseSearcher):
         alived_hyps,
         inp_tokens,
         log_probs,
-        eos_hyps_and_log_probs_scores,
+        finished_hyps,
         memory,
         scorer_memory,
         attn,
@@ -1136,8 +1345,8 @@ class S2SBeamSearcher(S2SBaseSearcher):
             The input tensor of the current step.
         log_probs : torch.Tensor
             The log-probabilities of the current step output.
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
         memory : No limit
             The memory variables input for this step.
             (ex. RNN hidden states).
@@ -1163,8 +1372,8 @@ class S2SBeamSearcher(S2SBaseSearcher):
             The input tensor of the current step.
         log_probs : torch.Tensor
             The log-probabilities of the current step output.
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
         memory : No limit
             The memory variables generated in this step.
         scorer_memory : No limit
@@ -1180,19 +1389,39 @@ class S2SBeamSearcher(S2SBaseSearcher):
             inp_tokens, memory, enc_states, enc_lens, attn, log_probs,
         )
 
-        # Keep the original value
-        log_probs_clone = log_probs.clone().reshape(self.batch_size, -1)
-
-        (log_probs, prev_attn_peak,) = self._max_attn_shift_step(
-            attn, prev_attn_peak, log_probs,
-        )
+        # The masks, clone, adds and topk below are all bound by traffic
+        # on this (n_bh, n_out) tensor; bfloat16 halves it. Sequence
+        # scores keep accumulating in fp32.
+        if self.bf16_log_probs:
+            log_probs = log_probs.to(torch.bfloat16)
+
+        # Keep the original value. With a scorer the log_probs are about
+        # to accumulate scorer contributions, so the raw decoder values
+        # must be snapshotted for alived_log_probs. Without one, the
+        # masks below only overwrite entries that can no longer win the
+        # topk, so a view of the tensor serves as its own snapshot and
+        # the full (n_bh, n_out) copy is skipped.
+        if self.scorer is not None:
+            log_probs_clone = log_probs.clone().reshape(self.batch_size, -1)
+        else:
+            log_probs_clone = log_probs.reshape(self.batch_size, -1)
 
-        log_probs = self._set_eos_minus_inf_step(
-            log_probs, step, self.min_decode_steps,
+        # One fused call applies the max-attn-shift and eos masks. The
+        # step count is resolved to a boolean here so the helper only
+        # ever sees two argument variants per decode.
+        log_probs, prev_attn_peak = self._mask_log_probs_fn(
+            log_probs,
+            attn,
+            prev_attn_peak,
+            step < self.min_decode_steps,
+            self.eos_index,
+            self.eos_threshold,
+            self.max_attn_shift,
+            self.using_max_attn_shift,
+            self.using_eos_threshold,
+            self.minus_inf,
         )
 
-        log_probs = self._eos_threshold_step(log_probs)
-
         (log_probs, scorer_memory,) = self._scorer_step(
             inp_tokens, scorer_memory, attn, log_probs,
         )
@@ -1212,21 +1441,25 @@ class S2SBeamSearcher(S2SBaseSearcher):
         )
 
         alived_hyps = self._update_sequences_and_log_probs(
-            log_probs_clone, inp_tokens, predecessors, candidates, alived_hyps,
+            log_probs_clone, inp_tokens, predecessors, candidates, alived_hyps, step,
         )
 
         is_eos = self._update_hyps_and_scores_if_eos_token(
-            inp_tokens, alived_hyps, eos_hyps_and_log_probs_scores, scores,
+            inp_tokens, alived_hyps, finished_hyps, scores,
         )
 
-        # Block the paths that have reached eos.
-        alived_hyps.sequence_scores.masked_fill_(is_eos, float("-inf"))
+        # Block the paths that have reached eos. The mask must stay
+        # finite: the pad columns of the topk scratch hold -inf, and a
+        # fully finished utterance keeps stepping until the whole batch
+        # is done, so its real columns have to strictly beat the pads
+        # rather than tie with them.
+        alived_hyps.sequence_scores.masked_fill_(is_eos, self.minus_inf)
 
         return (
             alived_hyps,
             inp_tokens,
             log_probs,
-            eos_hyps_and_log_probs_scores,
+            finished_hyps,
             memory,
             scorer_memory,
             attn,
@@ -1234,8 +1467,106 @@ class S2SBeamSearcher(S2SBaseSearcher):
             scores,
         )
 
+    def _compact_finished_batches(
+        self,
+        alived_hyps,
+        inp_tokens,
+        log_probs,
+        finished_hyps,
+        memory,
+        prev_attn_peak,
+        enc_states,
+        enc_lens,
+        scores,
+    ):
+        """Drop the rows of batch elements whose beam is already full, so
+        forward_step only computes over utterances that are still decoding.
+
+        Arguments
+        ---------
+        alived_hyps : AlivedHypotheses
+            The alived hypotheses.
+        inp_tokens : torch.Tensor
+            The input tensor of the current step.
+        log_probs : torch.Tensor
+            The log-probabilities of the current step output.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
+        memory : No limit
+            The memory variables input for this step.
+            (ex. RNN hidden states).
+        prev_attn_peak : torch.Tensor
+            The previous attention peak place.
+        enc_states : torch.Tensor
+            The encoder states to be attended.
+        enc_lens : torch.Tensor
+            The actual length of each enc_states sequence.
+        scores : torch.Tensor
+            The scores of the current step output.
+
+        Returns
+        -------
+        The same state, restricted to the still-active rows.
+        """
+        active = [
+            pos
+            for pos, batch_id in enumerate(self._active_batch_ids)
+            if finished_hyps.counts[batch_id] < self.beam_size
+        ]
+        if len(active) == self.batch_size:
+            return (
+                alived_hyps,
+                inp_tokens,
+                log_probs,
+                memory,
+                prev_attn_peak,
+                enc_states,
+                enc_lens,
+                scores,
+            )
+
+        rows = (
+            torch.tensor(active, dtype=torch.long, device=self.device)
+            .unsqueeze(1)
+            .mul(self.beam_size)
+            + self._beam_arange
+        ).view(-1)
+
+        self._active_batch_ids = [self._active_batch_ids[pos] for pos in active]
+        self.batch_size = len(active)
+        self.n_bh = self.batch_size * self.beam_size
+        self.beam_offset = self._orig_beam_offset[: self.batch_size]
+        self._beam_offset_unsq = self.beam_offset.unsqueeze(1)
+        self._scores_scratch = self._scores_scratch[: self.n_bh]
+
+        alived_hyps.alived_seq = alived_hyps.alived_seq.index_select(0, rows)
+        alived_hyps.alived_log_probs = alived_hyps.alived_log_probs.index_select(
+            0, rows
+        )
+        alived_hyps.sequence_scores = alived_hyps.sequence_scores.index_select(
+            0, rows
+        )
+        inp_tokens = inp_tokens.index_select(0, rows)
+        log_probs = log_probs.index_select(0, rows)
+        memory = self._attn_weight_permute_memory_step(memory, rows)
+        prev_attn_peak = prev_attn_peak.index_select(0, rows)
+        enc_states = enc_states.index_select(0, rows)
+        enc_lens = enc_lens.index_select(0, rows)
+        scores = scores.index_select(0, rows)
+
+        return (
+            alived_hyps,
+            inp_tokens,
+            log_probs,
+            memory,
+            prev_attn_peak,
+            enc_states,
+            enc_lens,
+            scores,
+        )
+
     def _fill_alived_hyps_with_eos_token(
-        self, alived_hyps, eos_hyps_and_log_probs_scores, scores,
+        self, alived_hyps, finished_hyps, scores,
     ):
         """Fill the alived_hyps that have not reached eos with eos.
 
@@ -1243,29 +1574,41 @@ class S2SBeamSearcher(S2SBaseSearcher):
         ---------
         alived_hyps : AlivedHypotheses
             The alived hypotheses.
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
         scores : torch.Tensor
             The scores of the current step output.
 
         Returns
         -------
-        eos_hyps_and_log_probs_scores : list
-            Generated hypotheses (the one that haved reached eos) and log probs scores.
+        finished_hyps : FinishedHypotheses
+            The hypotheses that have reached eos.
         """
-        if not self._check_full_beams(eos_hyps_and_log_probs_scores):
-            # Using all eos to fill-up the hyps.
-            inp_tokens = (
-                torch.zeros(self.n_bh, device=self.device)
-                .fill_(self.eos_index)
-                .long()
-            )
-            self._update_hyps_and_scores_if_eos_token(
-                inp_tokens, alived_hyps, eos_hyps_and_log_probs_scores, scores,
+        if not self._check_full_beams(finished_hyps):
+            # The slot bookkeeping already lives on the host, so the
+            # remaining slots can be enumerated directly instead of
+            # faking an all-eos step and re-running the eq/nonzero/sync
+            # machinery over every alive row.
+            src_rows, dst_batch, dst_slot = [], [], []
+            for active_id, batch_id in enumerate(self._active_batch_ids):
+                count = finished_hyps.counts[batch_id]
+                if count == self.beam_size:
+                    continue
+                base = active_id * self.beam_size
+                for slot in range(count, self.beam_size):
+                    src_rows.append(base + slot - count)
+                    dst_batch.append(batch_id)
+                    dst_slot.append(slot)
+                finished_hyps.counts[batch_id] = self.beam_size
+                self._n_full_batches += 1
+            self._store_finished_rows(
+                alived_hyps, finished_hyps, scores, src_rows, dst_batch,
+                dst_slot,
             )
 
-        return eos_hyps_and_log_probs_scores
+        return finished_hyps
 
+    @torch.inference_mode()
     def forward(self, enc_states, wav_len):  # noqa: C901
         """Applies beamsearch and returns the predicted tokens.
 
@@ -1291,7 +1634,7 @@ class S2SBeamSearcher(S2SBaseSearcher):
             alived_hyps,
             inp_tokens,
             log_probs,
-            eos_hyps_and_log_probs_scores,
+            finished_hyps,
             memory,
             scorer_memory,
             attn,
@@ -1302,14 +1645,14 @@ class S2SBeamSearcher(S2SBaseSearcher):
 
         for step in range(self.max_decode_steps):
             # terminate condition
-            if self._check_full_beams(eos_hyps_and_log_probs_scores):
+            if self._check_full_beams(finished_hyps):
                 break
 
             (
                 alived_hyps,
                 inp_tokens,
                 log_probs,
-                eos_hyps_and_log_probs_scores,
+                finished_hyps,
                 memory,
                 scorer_memory,
                 attn,
@@ -1319,7 +1662,7 @@ class S2SBeamSearcher(S2SBaseSearcher):
                 alived_hyps,
                 inp_tokens,
                 log_probs,
-                eos_hyps_and_log_probs_scores,
+                finished_hyps,
                 memory,
                 scorer_memory,
                 attn,
@@ -1329,10 +1672,48 @@ class S2SBeamSearcher(S2SBaseSearcher):
                 step,
             )
 
+            # Periodically drop finished utterances from the active batch so
+            # the decoder and the bookkeeping shrink with them. Only done
+            # without a scorer (scorer memories include token-indexed CTC
+            # state this class cannot re-slice) and for searchers whose
+            # decoder keeps no row-shaped state of its own.
+            if (
+                self._supports_batch_compaction
+                and self.scorer is None
+                and (step & 7) == 7
+            ):
+                (
+                    alived_hyps,
+                    inp_tokens,
+                    log_probs,
+                    memory,
+                    prev_attn_peak,
+                    enc_states,
+                    enc_lens,
+                    scores,
+                ) = self._compact_finished_batches(
+                    alived_hyps,
+                    inp_tokens,
+                    log_probs,
+                    finished_hyps,
+                    memory,
+                    prev_attn_peak,
+                    enc_states,
+                    enc_lens,
+                    scores,
+                )
+
         finals_hyps_and_log_probs_scores = self._fill_alived_hyps_with_eos_token(
-            alived_hyps, eos_hyps_and_log_probs_scores, scores,
+            alived_hyps, finished_hyps, scores,
         )
 
+        # Restore the original batch geometry for the topk extraction.
+        if self.batch_size != self._orig_batch_size:
+            self.batch_size = self._orig_batch_size
+            self.n_bh = self.batch_size * self.beam_size
+            self.beam_offset = self._orig_beam_offset
+            self._beam_offset_unsq = self.beam_offset.unsqueeze(1)
+
         (
             topk_hyps,
             topk_lengths,
@@ -1432,8 +1813,12 @@ class S2SRNNBeamSearcher(S2SBeamSearcher):
         self.emb = embedding
         self.dec = decoder
         self.fc = linear
-        self.softmax = torch.nn.LogSoftmax(dim=-1)
         self.temperature = temperature
+        # The attentional decoder caches row-shaped encoder projections
+        # (attn.precomputed_enc_h), which this class cannot re-slice.
+        self._supports_batch_compaction = False
+        # Reused destination buffers for permute_mem, keyed by role.
+        self._mem_bufs = {}
 
     def reset_mem(self, batch_size, device):
         """Needed to reset the memory during beamsearch."""
@@ -1450,25 +1835,37 @@ class S2SRNNBeamSearcher(S2SBeamSearcher):
             dec_out, hs, c, w = self.dec.forward_step(
                 e, hs, c, enc_states, enc_lens
             )
-            log_probs = self.softmax(self.fc(dec_out) / self.temperature)
+            log_probs = torch.nn.functional.log_softmax(
+                self.fc(dec_out) / self.temperature, dim=-1
+            )
             # average attn weight of heads when attn_type is multiheadlocation
             if self.dec.attn_type == "multiheadlocation":
                 w = torch.mean(w, dim=1)
         return log_probs, (hs, c), w
 
+    def _permute_into(self, src, dim, index, key):
+        """index_select into a persistent buffer so the RNN state permute
+        does not hit the allocator every step. The sources are fresh
+        outputs of the decoder cell, so they never alias the buffers."""
+        buf = self._mem_bufs.get(key)
+        if buf is None or buf.shape != src.shape:
+            buf = torch.empty_like(src)
+            self._mem_bufs[key] = buf
+        return torch.index_select(src, dim, index, out=buf)
+
     def permute_mem(self, memory, index):
         """Memory permutation during beamsearch."""
         hs, c = memory
 
         # shape of hs: [num_layers, batch_size, n_neurons]
         if isinstance(hs, tuple):
-            hs_0 = torch.index_select(hs[0], dim=1, index=index)
-            hs_1 = torch.index_select(hs[1], dim=1, index=index)
+            hs_0 = self._permute_into(hs[0], 1, index, "hs0")
+            hs_1 = self._permute_into(hs[1], 1, index, "hs1")
             hs = (hs_0, hs_1)
         else:
-            hs = torch.index_select(hs, dim=1, index=index)
+            hs = self._permute_into(hs, 1, index, "hs")
 
-        c = torch.index_select(c, dim=0, index=index)
+        c = self._permute_into(c, 0, index, "c")
         if self.dec.attn_type == "location":
             self.dec.attn.prev_attn = torch.index_select(
                 self.dec.attn.prev_attn, dim=0, index=index
@@ -1489,6 +1886,9 @@ class S2STransformerBeamSearcher(S2SBeamSearcher):
             A linear output layer.
     linear : torch.nn.Module
         A linear output layer.
+    bf16_fc : bool
+        If True, keep the output projection in bfloat16 (inference only).
+        Logits are computed in bf16 and upcast before the log-softmax.
     **kwargs
         Arguments to pass to S2SBeamSearcher
     Example
@@ -1523,7 +1923,7 @@ class S2STransformerBeamSearcher(S2SBeamSearcher):
     """
 
     def __init__(
-        self, modules, temperature=1.0, **kwargs,
+        self, modules, temperature=1.0, bf16_fc=False, **kwargs,
     ):
         super(S2STransformerBeamSearcher, self).__init__(**kwargs)
 
@@ -1532,6 +1932,14 @@ class S2STransformerBeamSearcher(S2SBeamSearcher):
         self.softmax = torch.nn.LogSoftmax(dim=-1)
 
         self.temperature = temperature
+        self._inv_temperature = 1.0 / temperature
+        # Inference-only option: keep the (d_model, vocab) output
+        # projection in bf16. It is the dominant matmul of each step and
+        # the halved weight reads pay off on bf16-capable hardware
+        # (tensor cores, AMX). Logits are upcast before the softmax.
+        self.bf16_fc = bf16_fc
+        if bf16_fc:
+            self.fc = self.fc.to(torch.bfloat16)
 
     def reset_mem(self, batch_size, device):
         """Needed to reset the memory during beamsearch."""
@@ -1546,8 +1954,22 @@ class S2STransformerBeamSearcher(S2SBeamSearcher):
         """Performs a step in the implemented beamsearcher."""
         memory = _update_mem(inp_tokens, memory)
         pred, attn = self.model.decode(memory, enc_states, enc_lens)
-        prob_dist = self.softmax(self.fc(pred) / self.temperature)
-        return prob_dist[:, -1, :], memory, attn
+        # Only the last position is decoded this step; slice before the
+        # output projection so fc and softmax run on (n_bh, d) instead of
+        # the whole (n_bh, t, d) prefix.
+        last = pred[:, -1]
+        if self.bf16_fc:
+            logits = self.fc(last.to(torch.bfloat16))
+            # With bf16_log_probs the softmax itself also runs in bf16
+            # and halves its bytes; otherwise normalize in fp32.
+            if not self.bf16_log_probs:
+                logits = logits.float()
+        elif self.bf16_log_probs:
+            logits = self.fc(last).to(torch.bfloat16)
+        else:
+            logits = self.fc(last)
+        prob_dist = self.softmax(logits / self.temperature)
+        return prob_dist, memory, attn
 
 
 class S2SWhisperGreedySearch(S2SGreedySearcher):
@@ -1619,10 +2041,16 @@ class S2SWhisperGreedySearch(S2SGreedySearcher):
         They are directly taken from the tokenizer.prefix_tokens attribute.
         decoder_input_tokens = [bos_token, language_token, task_token, timestamp_token]
         """
-        self.set_bos_token(decoder_input_tokens[0])
-        self.set_language_token(decoder_input_tokens[1])
-        self.set_task_token(decoder_input_tokens[2])
-        self.set_timestamp_token(decoder_input_tokens[3])
+        (
+            self.bos_token,
+            self.language_token,
+            self.task_token,
+            self.timestamp_token,
+        ) = decoder_input_tokens
+        # need to reset bos_index too as timestamp_token is the first
+        # inp_token and need to be the first so that the first input gave
+        # to the model is [bos, language, task, timestamp] (order matters).
+        self.bos_index = self.timestamp_token
 
         # bos will be timestamp in our case.
         self.decoder_input_tokens = [
@@ -1630,10 +2058,18 @@ class S2SWhisperGreedySearch(S2SGreedySearcher):
             self.language_token,
             self.task_token,
         ]
+        # Cached once here; reset_mem runs per utterance and only
+        # expands it instead of rebuilding a CPU tensor every time.
+        # Pinned so the one-time host-to-device copy can run async.
+        self._prefix = torch.tensor(self.decoder_input_tokens)
+        if torch.cuda.is_available():
+            self._prefix = self._prefix.pin_memory()
 
     def reset_mem(self, batch_size, device):
         """This method set the first tokens to be decoder_input_tokens during search."""
-        return torch.tensor([self.decoder_input_tokens] * batch_size).to(device)
+        # no-op after the first call on a given device
+        self._prefix = self._prefix.to(device, non_blocking=True)
+        return self._prefix.unsqueeze(0).expand(batch_size, -1).contiguous()
 
     def permute_mem(self, memory, index):
         """Memory permutation during beamsearch."""
@@ -1672,12 +2108,15 @@ class S2STransformerGreedySearch(S2SGreedySearcher):
             A linear output layer for the seq2seq model.
     temperature : float
         Temperature to use during decoding.
+    bf16_fc : bool
+        If True, keep the output projection in bfloat16 (inference only).
+        Logits are computed in bf16 and upcast before the log-softmax.
     **kwargs
         Arguments to pass to S2SGreedySearcher
     """
 
     def __init__(
-        self, modules, temperature=1.0, **kwargs,
+        self, modules, temperature=1.0, bf16_fc=False, **kwargs,
     ):
         super(S2SGreedySearcher, self).__init__(**kwargs)
 
@@ -1686,6 +2125,9 @@ class S2STransformerGreedySearch(S2SGreedySearcher):
         self.softmax = torch.nn.LogSoftmax(dim=-1)
 
         self.temperature = temperature
+        self.bf16_fc = bf16_fc
+        if bf16_fc:
+            self.fc = self.fc.to(torch.bfloat16)
 
     def reset_mem(self, batch_size, device):
         """Needed to reset the memory during greedy search."""
@@ -1695,8 +2137,15 @@ class S2STransformerGreedySearch(S2SGreedySearcher):
         """Performs a step in the implemented greedy searcher."""
         memory = _update_mem(inp_tokens, memory)
         pred, attn = self.model.decode(memory, enc_states, enc_lens)
-        prob_dist = self.softmax(self.fc(pred) / self.temperature)
-        return prob_dist[:, -1, :], memory, attn
+        # Slice before the projection: fc and softmax only ever need the
+        # last position, not the whole decoded prefix.
+        last = pred[:, -1]
+        if self.bf16_fc:
+            logits = self.fc(last.to(torch.bfloat16)).float()
+        else:
+            logits = self.fc(last)
+        prob_dist = self.softmax(logits / self.temperature)
+        return prob_dist, memory, attn
 
 
 class S2SWhisperBeamSearch(S2SBeamSearcher):
@@ -1721,6 +2170,9 @@ class S2SWhisperBeamSearch(S2SBeamSearcher):
     max_length : int
         The maximum decoding steps to perform.
         The Whisper model has a maximum length of 448.
+    compile_decoder : bool
+        If True, run the underlying HF decoder through torch.compile
+        with dynamic shapes. Default: False.
     **kwargs
         Arguments to pass to S2SBeamSearcher
     """
@@ -1734,15 +2186,26 @@ class S2SWhisperBeamSearch(S2SBeamSearcher):
         task_token=50359,
         timestamp_token=50363,
         max_length=448,
+        compile_decoder=False,
         **kwargs,
     ):
         super(S2SWhisperBeamSearch, self).__init__(**kwargs)
 
         self.model = module[0]
-
-        self.softmax = torch.nn.LogSoftmax(dim=-1)
+        if compile_decoder and hasattr(torch, "compile"):
+            # The key/value cache grows by one token per step, so the
+            # decoder is traced with dynamic shapes; a static-shape
+            # (reduce-overhead) compile would recompile on every step
+            # until the cache can be preallocated.
+            self.model.model.decoder = torch.compile(
+                self.model.model.decoder, dynamic=True
+            )
 
         self.temperature = temperature
+        # Multiply by the reciprocal and log-softmax functionally: one
+        # pointwise pass over the vocab-sized logits instead of a module
+        # dispatch plus a divide kernel.
+        self._inv_temperature = 1.0 / temperature
 
         self.decoder_input_tokens = None
         self.language_token = language_token  # default language is english
@@ -1784,10 +2247,16 @@ class S2SWhisperBeamSearch(S2SBeamSearcher):
         They are directly taken from the tokenizer.prefix_tokens attribute.
         decoder_input_tokens = [bos_token, language_token, task_token, timestamp_token]
         """
-        self.set_bos_token(decoder_input_tokens[0])
-        self.set_language_token(decoder_input_tokens[1])
-        self.set_task_token(decoder_input_tokens[2])
-        self.set_timestamp_token(decoder_input_tokens[3])
+        (
+            self.bos_token,
+            self.language_token,
+            self.task_token,
+            self.timestamp_token,
+        ) = decoder_input_tokens
+        # need to reset bos_index too as timestamp_token is the first
+        # inp_token and need to be the first so that the first input gave
+        # to the model is [bos, language, task, timestamp] (order matters).
+        self.bos_index = self.timestamp_token
 
         # bos will be timestamp in our case.
         self.decoder_input_tokens = [
@@ -1795,25 +2264,97 @@ class S2SWhisperBeamSearch(S2SBeamSearcher):
             self.language_token,
             self.task_token,
         ]
+        # Cached once here; reset_mem runs per utterance and only
+        # expands it instead of rebuilding a CPU tensor every time.
+        # Pinned so the one-time host-to-device copy can run async.
+        self._prefix = torch.tensor(self.decoder_input_tokens)
+        if torch.cuda.is_available():
+            self._prefix = self._prefix.pin_memory()
 
     def reset_mem(self, batch_size, device):
         """This method set the first tokens to be decoder_input_tokens during search."""
-        return torch.tensor([self.decoder_input_tokens] * batch_size).to(device)
+        # no-op after the first call on a given device
+        self._prefix = self._prefix.to(device, non_blocking=True)
+        return self._prefix.unsqueeze(0).expand(batch_size, -1).contiguous()
 
     def permute_mem(self, memory, index):
-        """Permutes the memory."""
-        memory = torch.index_select(memory, dim=0, index=index)
-        return memory
+        """Permutes the memory (the per-layer key/value cache)."""
+        # Each layer caches (self_k, self_v, cross_k, cross_v). The
+        # cross keys/values depend only on the encoder states, which
+        # are identical across the beams of one utterance, so the
+        # within-beam reorder (index rows == cache rows) leaves them
+        # untouched. A shrinking index means batch compaction, where
+        # whole utterances drop out and every tensor must be re-sliced.
+        permute_cross = index.shape[0] != memory[0][0].shape[0]
+        return tuple(
+            tuple(
+                torch.index_select(kv, dim=0, index=index)
+                if i < 2 or permute_cross
+                else kv
+                for i, kv in enumerate(layer)
+            )
+            for layer in memory
+        )
 
     def set_n_out(self):
         """set the number of output tokens."""
         return self.model.model.decoder.embed_tokens.weight.shape[0]
 
+    def _prefill(self, inp_tokens, prefix, enc_states):
+        """Runs the shared task prefix through the decoder.
+
+        Every beam of an utterance decodes the same prefix, so when the
+        attention weights are not needed the prefill runs on one row
+        per utterance and the resulting cache is expanded to the beams:
+        the cross-attention projections over the full encoder output
+        are computed once per utterance instead of once per beam.
+        """
+        input_ids = torch.cat([prefix, inp_tokens.unsqueeze(1)], dim=-1)
+        if self.model.output_attentions or self.beam_size == 1:
+            return self.model.forward_decoder(
+                enc_states, input_ids, past_key_values=None, use_cache=True
+            )
+        rows = torch.arange(
+            0, input_ids.size(0), self.beam_size, device=input_ids.device
+        )
+        dec_out, attn, kv = self.model.forward_decoder(
+            enc_states.index_select(0, rows),
+            input_ids.index_select(0, rows),
+            past_key_values=None,
+            use_cache=True,
+        )
+        dec_out = dec_out.repeat_interleave(self.beam_size, dim=0)
+        kv = tuple(
+            tuple(t.repeat_interleave(self.beam_size, dim=0) for t in layer)
+            for layer in kv
+        )
+        return dec_out, attn, kv
+
     def forward_step(self, inp_tokens, memory, enc_states, enc_lens):
         """Performs a step in the implemented beamsearcher."""
-        memory = _update_mem(inp_tokens, memory)
-        dec_out, attn, = self.model.forward_decoder(enc_states, memory)
-        log_probs = self.softmax(dec_out[:, -1] / self.temperature)
+        # Incremental decoding: the first step prefills the decoder with
+        # the task prefix, every later step feeds only the new token and
+        # the cached key/values, so the attention work per step is O(T)
+        # instead of re-encoding the whole history (O(T^2) overall).
+        if torch.is_tensor(memory):
+            dec_out, attn, memory = self._prefill(
+                inp_tokens, memory, enc_states
+            )
+        else:
+            dec_out, attn, memory = self.model.forward_decoder(
+                enc_states,
+                inp_tokens.unsqueeze(1),
+                past_key_values=memory,
+                use_cache=True,
+            )
+        logits = dec_out[:, -1]
+        # Casting before the softmax (not after, as the base class
+        # would) halves the bytes of the vocab-wide normalization too.
+        if self.bf16_log_probs:
+            logits = logits.to(torch.bfloat16)
+        log_probs = torch.nn.functional.log_softmax(
+            logits * self._inv_temperature, dim=-1
+        )
         return log_probs, memory, attn
 
 
@@ -1848,10 +2389,23 @@ class S2SHFTextBasedBeamSearcher(S2STransformerBeamSearcher):
         """Performs a step in the implemented beamsearcher."""
         memory = _update_mem(inp_tokens, memory)
         pred, attn = self.model.decode(memory, enc_states, enc_lens)
+        # Only the last position is needed; slice before the projection
+        # and softmax so they run on (n_bh, d) instead of the prefix.
+        pred = pred[:, -1]
         if self.fc is not None:
+            if self.bf16_fc:
+                pred = pred.to(torch.bfloat16)
             pred = self.fc(pred)
-        prob_dist = self.softmax(pred / self.temperature)
-        return prob_dist[:, -1, :], memory, attn
+        if self.bf16_log_probs:
+            # Cast before the softmax so the vocab-wide normalization
+            # runs in bf16 as well.
+            pred = pred.to(torch.bfloat16)
+        elif self.bf16_fc:
+            pred = pred.float()
+        prob_dist = torch.nn.functional.log_softmax(
+            pred * self._inv_temperature, dim=-1
+        )
+        return prob_dist, memory, attn
 
     def set_n_out(self):
         """set the number of output tokens."""
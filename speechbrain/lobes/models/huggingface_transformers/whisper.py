@@ -80,6 +80,9 @@ class Whisper(HFTransformersInterface):
         output_attentions=True,
         output_all_hiddens=False,
     ):
+        # Needed before super().__init__ loads the model (see
+        # override_config).
+        self.output_attentions = output_attentions
         super().__init__(
             source=source,
             save_path=save_path,
@@ -89,7 +92,6 @@ class Whisper(HFTransformersInterface):
         self.sampling_rate = sampling_rate
         self.encoder_only = encoder_only
         self.freeze_encoder = freeze_encoder
-        self.output_attentions = output_attentions
         self.output_all_hiddens = output_all_hiddens
 
         if encoder_only:
@@ -124,6 +126,29 @@ class Whisper(HFTransformersInterface):
             for param in self.model.encoder.parameters():
                 param.requires_grad = False
 
+    def override_config(self, config):
+        """Request the scaled-dot-product-attention kernels.
+
+        Only done when the attention weights are not returned: the sdpa
+        path cannot output them and transformers would silently fall
+        back to the eager implementation.
+
+        Arguments
+        ---------
+        config : HuggingFace config object
+            The original config.
+
+        Returns
+        -------
+        config : HuggingFace config object
+            Overridden config.
+        """
+        if not self.output_attentions and hasattr(
+            config, "_attn_implementation"
+        ):
+            config._attn_implementation = "sdpa"
+        return config
+
     def freeze_model(self, model):
         """
         Freezes parameters of a model.
@@ -309,7 +334,13 @@ class Whisper(HFTransformersInterface):
 
         return array
 
-    def forward_decoder(self, audio_features, decoder_input_ids):
+    def forward_decoder(
+        self,
+        audio_features,
+        decoder_input_ids,
+        past_key_values=None,
+        use_cache=False,
+    ):
         """Perform one step of the whisper decoder.
 
         Arguments
@@ -325,15 +356,32 @@ class Whisper(HFTransformersInterface):
             Please refer to the whisper paper for more details or go to the
             seq2seq2.py file in SpeechBrain to see how to generate the tokens
             with Greedy Search and/or Beam Search.
+        past_key_values : tuple (default: None)
+            The self- and cross-attention key/values cached by a previous
+            call. When given, decoder_input_ids only needs to hold the
+            tokens that are not part of the cache yet, so the attention
+            work per step stays linear in the decoded length.
+        use_cache : bool (default: False)
+            If True, the updated key/value cache is returned as a third
+            output.
         """
         output_states = self.model.decoder(
             encoder_hidden_states=audio_features,
             input_ids=decoder_input_ids,
+            past_key_values=past_key_values,
+            use_cache=use_cache,
             output_attentions=self.output_attentions,
         )
 
-        attn = output_states.attentions[-1]
-        attn = attn.view(attn.shape[0] * attn.shape[1], *attn.shape[2:])
+        if self.output_attentions:
+            attn = output_states.attentions[-1]
+            attn = attn.view(attn.shape[0] * attn.shape[1], *attn.shape[2:])
+        else:
+            # Not materializing the attention probs keeps the sdpa fast
+            # path available (it cannot return them) and skips a
+            # (batch, heads, tgt, src) write per layer and step.
+            attn = None
+        kv_cache = output_states.past_key_values
         output_states = output_states.last_hidden_state
 
         logits = (
@@ -345,4 +393,6 @@ class Whisper(HFTransformersInterface):
             )
         ).to(audio_features.dtype)
 
+        if use_cache:
+            return logits, attn, kv_cache
         return logits, attn
@@ -1,25 +1,67 @@
+import logging
+
 import torch
-from transformers import pipeline
+from transformers import AutoModelForSpeechSeq2Seq, BitsAndBytesConfig, pipeline
+
+logger = logging.getLogger(__name__)
 
 
 class Transcriptor:
-  def __init__(self):
-    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+  def __init__(self, quantization=None, assistant_model=None):
+    use_cuda = torch.cuda.is_available()
+    device = "cuda:0" if use_cuda else "cpu"
+    # Autoregressive decoding is memory-bandwidth bound: halving the
+    # weight bytes roughly halves the traffic per generated token.
+    # Default is half precision; "8bit" loads the weights through
+    # bitsandbytes (CUDA only).
+    model_kwargs = {
+      # sdpa dispatches to the flash/mem-efficient attention kernels,
+      # cutting attention memory traffic on the audio chunks.
+      "attn_implementation": "sdpa",
+    }
+    if quantization == "8bit":
+      model_kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+    else:
+      model_kwargs["torch_dtype"] = torch.float16 if use_cuda else torch.bfloat16
+    generate_kwargs = None
+    # Speculative decoding: a small draft model (e.g.
+    # "distil-whisper/distil-large-v3") proposes tokens that large-v3
+    # verifies in one forward. ASR outputs are low entropy, so the
+    # acceptance rate - and the speedup - is high.
+    self.assisted = assistant_model is not None
+    if self.assisted:
+      assistant = AutoModelForSpeechSeq2Seq.from_pretrained(
+        assistant_model,
+        torch_dtype=model_kwargs.get("torch_dtype"),
+        attn_implementation="sdpa",
+        low_cpu_mem_usage=True,
+      )
+      if use_cuda:
+        assistant = assistant.to(device)
+      generate_kwargs = {"assistant_model": assistant}
     self.pipe = pipeline(
       "automatic-speech-recognition",
       model="openai/whisper-large-v3",
-      chunk_length_s=30,
-      device=device,
+      # 15s chunks halve the attention sequence length per decode and
+      # give the batcher more chunks to fill batches with.
+      chunk_length_s=15,
+      device=None if quantization == "8bit" else device,
+      model_kwargs=model_kwargs,
+      generate_kwargs=generate_kwargs,
       )
-  
-  def transcribe(self,audio): 
-    prediction = self.pipe(audio, batch_size=8, return_timestamps=True)["chunks"]
-    print(prediction)
-
-    return prediction
-    
-    
-
-
 
+  def transcribe(self,audio, timestamps=True):
+    # Assisted generation only supports batch size 1; otherwise keep
+    # more chunks in flight per forward. Parallel workers cover the mel
+    # feature extraction, which otherwise runs single-threaded.
+    batch_size = 1 if self.assisted else 16
+    # Timestamp tokens roughly double the decoded length, so callers
+    # that only need the text can turn them off. The default stays on:
+    # the CSI prompt correlates transcript and emotion timestamps.
+    if timestamps:
+      prediction = self.pipe(audio, batch_size=batch_size, num_workers=4, return_timestamps=True)["chunks"]
+    else:
+      prediction = self.pipe(audio, batch_size=batch_size, num_workers=4)["text"]
+    logger.debug("prediction=%s", prediction)
 
+    return prediction